@@ -11,7 +11,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import sqlite3
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from pathlib import Path
+from dataclasses import dataclass
 import io
 import base64
 from datetime import datetime, timedelta
@@ -51,100 +55,331 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def connect_readonly(db_path):
+    """Open a read-only SQLite connection tuned for analytical queries"""
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only=1")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+MONTH_NAMES = np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+PREVIEW_ROWS = 5
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Dates are ISO strings, with or without a time part (older loader builds stored '2010-02-05 00:00:00');
+# the ISO8601 parser is a fixed-format fast path that skips per-value inference
+DATE_FORMAT = 'ISO8601'
+
+# Narrow dtypes for the loaded tables (Weekly_Sales stays float64 so totals keep full precision)
+TABLE_DTYPES = {
+    'train': {'Store': 'int16', 'Dept': 'int16', 'IsHoliday': 'bool'},
+    'stores': {'Store': 'int16', 'Type': 'category', 'Size': 'int32'},
+    'features': {'Store': 'int16', 'Temperature': 'float32', 'Fuel_Price': 'float32',
+                 'CPI': 'float32', 'Unemployment': 'float32', 'IsHoliday': 'bool'}
+}
+
+def narrow_dtypes(df, table_name):
+    """Cast the known columns of a table to their compact dtypes"""
+    dtypes = TABLE_DTYPES[table_name]
+    return df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns})
+
+# Calendar helper columns added by add_time_columns, kept out of data previews
+TIME_COLUMNS = ['Month', 'YearMonth', 'YearQuarter', 'Year', 'Quarter', 'DayOfWeek']
+
+def add_time_columns(train):
+    """Derive the calendar columns used by the seasonality views"""
+    train['Month'] = train['Date'].dt.month.astype('int8')
+    
+    # Integer period keys (months/quarters since 1970-01) for cheap period grouping
+    train['YearMonth'] = train['Date'].values.astype('datetime64[M]').astype('int32')
+    train['YearQuarter'] = (train['YearMonth'] // 3).astype('int32')
+    train['Year'] = train['Date'].dt.year.astype('int16')
+    train['Quarter'] = train['Date'].dt.quarter.astype('int8')
+    train['DayOfWeek'] = pd.Categorical.from_codes(train['Date'].dt.dayofweek, categories=DAY_NAMES, ordered=True)
+    return train
+
+@dataclass
+class DataSummary:
+    """Headline figures for the loaded sales data"""
+    total_records: int
+    n_stores: int
+    n_depts: int
+    date_min: pd.Timestamp
+    date_max: pd.Timestamp
+    total_sales: float
+    avg_sales: float
+
+def summarize_sales(train):
+    """Compute the sidebar and overview metrics once per data version"""
+    return DataSummary(
+        total_records=len(train),
+        n_stores=int(train['Store'].nunique()),
+        n_depts=int(train['Dept'].nunique()),
+        date_min=train['Date'].min(),
+        date_max=train['Date'].max(),
+        total_sales=float(train['Weekly_Sales'].sum()),
+        avg_sales=float(train['Weekly_Sales'].mean())
+    )
+
+def prepare_tables(train, stores, features):
+    """Shared dtype and derived-column setup for freshly loaded tables"""
+    train = add_time_columns(narrow_dtypes(train, 'train'))
+    return train, narrow_dtypes(stores, 'stores'), narrow_dtypes(features, 'features'), summarize_sales(train)
+
+# Cached data access - db_mtime is part of the key so a rebuilt database is re-read
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_sample_tables():
+    """Create sample data if real data is not available"""
+    np.random.seed(42)
+    
+    # Generate sample data
+    stores = pd.DataFrame({
+        'Store': range(1, 46),
+        'Type': np.random.choice(['A', 'B', 'C'], 45, p=[0.3, 0.4, 0.3]),
+        'Size': np.random.randint(50000, 200000, 45)
+    })
+    
+    # Generate sample sales data
+    dates = pd.date_range('2010-02-01', '2012-11-30', freq='W')[:52]  # One year of data
+    n_store, n_dept, n_date = 10, 20, len(dates)  # Limited sample
+    n = n_store * n_dept * n_date
+    
+    date_arr = np.tile(dates.values, n_store * n_dept)
+    base_sales = np.random.normal(15000, 5000, n)
+    noise = np.random.normal(0, 2000, n)
+    
+    # Seasonal uplift for Nov/Dec, computed on the 52 weeks and repeated per store/dept
+    months = dates.month.to_numpy()
+    weekly_factor = np.where((months == 11) | (months == 12), 1.2, 1.0)
+    seasonal_factor = np.tile(weekly_factor, n_store * n_dept)
+    
+    train = pd.DataFrame({
+        'Store': np.repeat(np.arange(1, n_store + 1), n_dept * n_date),
+        'Dept': np.tile(np.repeat(np.arange(1, n_dept + 1), n_date), n_store),
+        'Date': date_arr,
+        'Weekly_Sales': np.maximum(0, base_sales * seasonal_factor + noise),
+        'IsHoliday': np.random.random(n) < 0.1
+    })
+    
+    # Generate features data
+    n_features = n_store * n_date
+    features = pd.DataFrame({
+        'Store': np.repeat(np.arange(1, n_store + 1), n_date),
+        'Date': np.tile(dates.values, n_store),
+        'Temperature': np.random.normal(70, 20, n_features),
+        'Fuel_Price': np.random.normal(3.5, 0.5, n_features),
+        'CPI': np.random.normal(200, 20, n_features),
+        'Unemployment': np.random.normal(8, 2, n_features)
+    })
+    
+    return prepare_tables(train, stores, features) + (False,)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_db_tables(db_path, db_mtime):
+    """Load the analysis tables from the SQLite database"""
+    conn = connect_readonly(db_path)
+    try:
+        train = pd.read_sql_query("SELECT * FROM train LIMIT 10000", conn)
+        stores = pd.read_sql_query("SELECT * FROM stores", conn)
+        features = pd.read_sql_query("SELECT * FROM features LIMIT 5000", conn)
+    finally:
+        conn.close()
+    
+    # Convert date columns
+    train['Date'] = pd.to_datetime(train['Date'], format=DATE_FORMAT)
+    features['Date'] = pd.to_datetime(features['Date'], format=DATE_FORMAT)
+    
+    return prepare_tables(train, stores, features) + (True,)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_parquet_tables(data_dir, parquet_mtime):
+    """Load the analysis tables from the Parquet copies written at upload"""
+    data_dir = Path(data_dir)
+    
+    # Only the leading rows are scanned, matching the database LIMITs
+    train = ds.dataset(data_dir / "train.parquet").head(10000).to_pandas(date_as_object=False)
+    stores = pd.read_parquet(data_dir / "stores.parquet")
+    
+    features_path = data_dir / "features.parquet"
+    if features_path.exists():
+        features = ds.dataset(features_path).head(5000).to_pandas(date_as_object=False)
+    else:
+        features = pd.DataFrame(columns=['Store', 'Date', 'Temperature', 'Fuel_Price', 'CPI', 'Unemployment'])
+    
+    return prepare_tables(train, stores, features) + (True,)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def join_train_features(data_key, _train, _features):
+    """Sales joined with the store/week features, computed once per data version"""
+    # Sorted (Store, Date) index on the features side; suffixes match what merge produced
+    features_indexed = (_features.astype({'Store': _train['Store'].dtype})
+                        .set_index(['Store', 'Date'])
+                        .sort_index())
+    return _train.join(features_indexed, on=['Store', 'Date'], how='inner', lsuffix='_x', rsuffix='_y')
+
+# Guards for queries typed into the SQL page
+MAX_QUERY_ROWS = 5000
+MAX_QUERY_INSTRUCTIONS = 500_000_000
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def execute_query(db_path, db_mtime, query, max_instructions=None, max_rows=None):
+    """Run a read query against the SQLite database"""
+    conn = connect_readonly(db_path)
+    try:
+        if max_instructions:
+            # SQLite calls the handler every 1000 VM instructions; a truthy return aborts
+            budget = iter(range(max_instructions // 1000))
+            conn.set_progress_handler(lambda: next(budget, None) is None, 1000)
+        
+        # The row cap is applied at fetch time, so it holds for any statement shape
+        cursor = conn.execute(query)
+        rows = cursor.fetchmany(max_rows) if max_rows else cursor.fetchall()
+        columns = [col[0] for col in cursor.description] if cursor.description else []
+        return pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        conn.close()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def sql_data_summary(db_path, db_mtime):
+    """Headline figures over the whole train table, in one SQLite scan"""
+    query = """
+    SELECT COUNT(*), COUNT(DISTINCT Store), COUNT(DISTINCT Dept),
+           MIN(Date), MAX(Date), SUM(Weekly_Sales), AVG(Weekly_Sales)
+    FROM train
+    """
+    records, stores, depts, date_min, date_max, total, avg = execute_query(db_path, db_mtime, query).iloc[0]
+    return DataSummary(
+        total_records=int(records),
+        n_stores=int(stores),
+        n_depts=int(depts),
+        date_min=pd.Timestamp(date_min),
+        date_max=pd.Timestamp(date_max),
+        total_sales=float(total or 0),
+        avg_sales=float(avg or 0)
+    )
+
+# Date bucketing expressions matching the pandas period labels
+PERIOD_SQL = {
+    "Weekly": "Date",
+    "Monthly": "strftime('%Y-%m', Date)",
+    "Quarterly": "strftime('%Y', Date) || 'Q' || ((CAST(strftime('%m', Date) AS INTEGER) + 2) / 3)",
+    "Yearly": "CAST(strftime('%Y', Date) AS INTEGER)"
+}
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def sql_sales_by_period(db_path, db_mtime, aggregation):
+    """Total sales per period, aggregated in SQLite"""
+    query = f"""
+    SELECT {PERIOD_SQL[aggregation]} AS Date, SUM(Weekly_Sales) AS Weekly_Sales
+    FROM train
+    GROUP BY 1
+    ORDER BY 1
+    """
+    result = execute_query(db_path, db_mtime, query)
+    if aggregation == "Weekly":
+        result['Date'] = pd.to_datetime(result['Date'], format=DATE_FORMAT)
+    return result
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def sql_store_performance(db_path, db_mtime):
+    """Per-store sales totals joined with store attributes, aggregated in SQLite"""
+    query = """
+    SELECT 
+        t.Store, s.Type, s.Size,
+        SUM(t.Weekly_Sales) AS Total_Sales,
+        AVG(t.Weekly_Sales) AS Avg_Sales,
+        COUNT(*) AS Record_Count
+    FROM train t
+    JOIN stores s ON s.Store = t.Store
+    GROUP BY t.Store, s.Type, s.Size
+    """
+    return execute_query(db_path, db_mtime, query)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def sql_dept_performance(db_path, db_mtime):
+    """Per-department sales statistics, aggregated in SQLite"""
+    query = """
+    SELECT 
+        Dept,
+        SUM(Weekly_Sales) AS Total_Sales,
+        AVG(Weekly_Sales) AS Avg_Sales,
+        SUM(Weekly_Sales * Weekly_Sales) AS Sum_Sq,
+        COUNT(*) AS Record_Count,
+        COUNT(DISTINCT Store) AS Store_Count
+    FROM train
+    GROUP BY Dept
+    """
+    result = execute_query(db_path, db_mtime, query)
+    
+    # SQLite has no STDEV, so derive the sample standard deviation from the sums
+    n = result['Record_Count']
+    variance = (result['Sum_Sq'] - n * result['Avg_Sales'] ** 2) / (n - 1)
+    result['Sales_Std'] = np.sqrt(variance.clip(lower=0)).where(n > 1)
+    
+    return result[['Dept', 'Total_Sales', 'Avg_Sales', 'Sales_Std', 'Record_Count', 'Store_Count']]
+
 class SalesAnalysisApp:
     def __init__(self):
-        self.db_path = Path("data/walmart_sales.db")
+        self.data_dir = Path("data")
+        self.db_path = self.data_dir / "walmart_sales.db"
         self.data_loaded = False
+        self.db_key = None
+        self.data_key = ("sample",)
         
-    def connect_db(self):
-        """Connect to SQLite database"""
-        try:
-            if self.db_path.exists():
-                self.conn = sqlite3.connect(str(self.db_path))
-                self.data_loaded = True
-                return True
-            else:
-                return False
-        except Exception as e:
-            st.error(f"Database connection error: {e}")
-            return False
+    def db_mtime(self):
+        """Modification time of the database, or None if it doesn't exist"""
+        if not self.db_path.exists():
+            return None
+        return self.db_path.stat().st_mtime
     
-    def load_sample_data(self):
-        """Create sample data if real data is not available"""
-        np.random.seed(42)
-        
-        # Generate sample data
-        stores = pd.DataFrame({
-            'Store': range(1, 46),
-            'Type': np.random.choice(['A', 'B', 'C'], 45, p=[0.3, 0.4, 0.3]),
-            'Size': np.random.randint(50000, 200000, 45)
-        })
-        
-        # Generate sample sales data
-        dates = pd.date_range('2010-02-01', '2012-11-30', freq='W')
-        sample_data = []
-        
-        for store in range(1, 11):  # Limited sample
-            for dept in range(1, 21):  # Limited departments
-                for date in dates[:52]:  # One year of data
-                    base_sales = np.random.normal(15000, 5000)
-                    seasonal_factor = 1.2 if date.month in [11, 12] else 1.0
-                    weekly_sales = max(0, base_sales * seasonal_factor + np.random.normal(0, 2000))
-                    
-                    sample_data.append({
-                        'Store': store,
-                        'Dept': dept,
-                        'Date': date,
-                        'Weekly_Sales': weekly_sales,
-                        'IsHoliday': np.random.choice([True, False], p=[0.1, 0.9])
-                    })
-        
-        train = pd.DataFrame(sample_data)
-        
-        # Generate features data
-        features_data = []
-        for store in range(1, 11):
-            for date in dates[:52]:
-                features_data.append({
-                    'Store': store,
-                    'Date': date,
-                    'Temperature': np.random.normal(70, 20),
-                    'Fuel_Price': np.random.normal(3.5, 0.5),
-                    'CPI': np.random.normal(200, 20),
-                    'Unemployment': np.random.normal(8, 2)
-                })
-        
-        features = pd.DataFrame(features_data)
+    def parquet_mtime(self):
+        """Modification time of the Parquet copies, or None if they are missing or stale"""
+        paths = [self.data_dir / f"{name}.parquet" for name in ("train", "stores", "features")]
+        if not (paths[0].exists() and paths[1].exists()):
+            return None
         
-        return train, stores, features
+        mtime = max(path.stat().st_mtime for path in paths if path.exists())
+        if self.db_path.exists() and mtime < self.db_path.stat().st_mtime:
+            return None
+        return mtime
     
     def load_data(self):
-        """Load data from database or create sample data"""
-        if self.connect_db():
+        """Load data from Parquet, the database, or create sample data"""
+        # Reads go through the cached query functions, which open their own connections
+        db_mtime = self.db_mtime()
+        self.data_loaded = db_mtime is not None
+        db_key = (str(self.db_path), db_mtime) if self.data_loaded else None
+        
+        # db_key routes the page aggregates to SQLite, so it is only set once real data has loaded
+        parquet_mtime = self.parquet_mtime()
+        if parquet_mtime is not None:
             try:
-                train = pd.read_sql_query("SELECT * FROM train LIMIT 10000", self.conn)
-                stores = pd.read_sql_query("SELECT * FROM stores", self.conn)
-                features = pd.read_sql_query("SELECT * FROM features LIMIT 5000", self.conn)
-                
-                # Convert date columns
-                train['Date'] = pd.to_datetime(train['Date'])
-                features['Date'] = pd.to_datetime(features['Date'])
-                
-                return train, stores, features, True
+                tables = load_parquet_tables(str(self.data_dir), parquet_mtime)
+                self.data_key = (str(self.data_dir), parquet_mtime)
+                self.db_key = db_key
+                return tables
+            except Exception as e:
+                st.warning(f"Could not load Parquet data: {e}")
+        
+        if db_key:
+            try:
+                tables = load_db_tables(*db_key)
+                self.data_key = self.db_key = db_key
+                return tables
             except Exception as e:
                 st.warning(f"Could not load from database: {e}. Using sample data.")
-                train, stores, features = self.load_sample_data()
-                return train, stores, features, False
+                return load_sample_tables()
         else:
             st.info("Using sample data for demonstration. Upload your CSV files to use real data.")
-            train, stores, features = self.load_sample_data()
-            return train, stores, features, False
+            return load_sample_tables()
     
     def run_sql_query(self, query, description="SQL Query"):
         """Execute SQL query and display results"""
         if self.data_loaded:
             try:
-                result = pd.read_sql_query(query, self.conn)
+                result = execute_query(str(self.db_path), self.db_path.stat().st_mtime,
+                                       query, MAX_QUERY_INSTRUCTIONS, MAX_QUERY_ROWS)
                 st.subheader(description)
                 st.dataframe(result)
                 
@@ -185,14 +420,15 @@ def main():
     )
     
     # Load data
-    train, stores, features, is_real_data = app.load_data()
+    train, stores, features, summary, is_real_data = app.load_data()
+    summary = get_data_summary(app, summary)
     
     # Data info sidebar
     st.sidebar.markdown("---")
     st.sidebar.subheader("📊 Data Info")
-    st.sidebar.metric("Records", len(train))
-    st.sidebar.metric("Stores", train['Store'].nunique())
-    st.sidebar.metric("Departments", train['Dept'].nunique())
+    st.sidebar.metric("Records", summary.total_records)
+    st.sidebar.metric("Stores", summary.n_stores)
+    st.sidebar.metric("Departments", summary.n_depts)
     
     if not is_real_data:
         st.sidebar.warning("⚠️ Using sample data")
@@ -201,22 +437,24 @@ def main():
     
     # Main content based on selected page
     if page == "🏠 Home & Overview":
-        show_home_page(train, stores, features)
+        show_home_page(app, train, stores, features, summary)
     
     elif page == "📈 Sales Trends":
-        show_sales_trends(train)
+        show_sales_trends(app, train)
     
     elif page == "🏪 Store Performance":
-        show_store_performance(train, stores)
+        show_store_performance(app, train, stores)
     
     elif page == "🏷️ Department Analysis":
-        show_department_analysis(train)
+        show_department_analysis(app, train)
     
     elif page == "📅 Seasonality Analysis":
         show_seasonality_analysis(train)
+        show_sample_note(train, summary)
     
     elif page == "🔍 Advanced Analytics":
-        show_advanced_analytics(train, features)
+        show_advanced_analytics(app, train, features)
+        show_sample_note(train, summary)
     
     elif page == "📊 SQL Query Interface":
         show_sql_interface(app)
@@ -224,7 +462,103 @@ def main():
     elif page == "📋 Data Upload":
         show_data_upload()
 
-def show_home_page(train, stores, features):
+def downsample_minmax(df, y, n_bins=250):
+    """Keep the lowest and highest point of each bin so long series stay cheap to plot"""
+    if len(df) <= 2 * n_bins:
+        return df
+    
+    values = df[y].to_numpy(dtype=np.float64)
+    keep = []
+    for bin_idx in np.array_split(np.arange(len(values)), n_bins):
+        bin_values = values[bin_idx]
+        keep.extend((bin_idx[np.nanargmin(bin_values)], bin_idx[np.nanargmax(bin_values)]))
+    
+    return df.iloc[np.unique(keep)]
+
+def rolling_mean(values, window):
+    """Trailing moving average from a running sum; the first window-1 points are NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        running_sum = np.cumsum(np.concatenate(([0.0], values)))
+        result[window - 1:] = (running_sum[window:] - running_sum[:-window]) / window
+    return result
+
+def get_data_summary(app, summary):
+    """Headline figures from the database, or the loaded frame's figures for sample data"""
+    if app.db_key:
+        try:
+            return sql_data_summary(*app.db_key)
+        except Exception as e:
+            st.warning(f"Could not query the database: {e}. Using the loaded data.")
+    
+    return summary
+
+def show_sample_note(train, summary):
+    """Flag pages computed from the loaded rows rather than the whole table"""
+    if len(train) < summary.total_records:
+        st.caption(f"ℹ️ Based on the first {len(train):,} of {summary.total_records:,} sales records.")
+
+def get_sales_by_period(app, train, aggregation):
+    """Total sales per period from the database, or from the loaded frame for sample data"""
+    if app.db_key:
+        try:
+            return sql_sales_by_period(*app.db_key, aggregation)
+        except Exception as e:
+            st.warning(f"Could not query the database: {e}. Using the loaded data.")
+    
+    if aggregation == "Weekly":
+        grouped_data = train.groupby('Date')['Weekly_Sales'].sum().reset_index()
+    elif aggregation == "Monthly":
+        grouped_data = train.groupby('YearMonth')['Weekly_Sales'].sum().reset_index()
+        grouped_data['YearMonth'] = [f"{1970 + m // 12}-{m % 12 + 1:02d}" for m in grouped_data['YearMonth']]
+    elif aggregation == "Quarterly":
+        grouped_data = train.groupby('YearQuarter')['Weekly_Sales'].sum().reset_index()
+        grouped_data['YearQuarter'] = [f"{1970 + q // 4}Q{q % 4 + 1}" for q in grouped_data['YearQuarter']]
+    else:  # Yearly
+        grouped_data = train.groupby('Year')['Weekly_Sales'].sum().reset_index()
+    
+    # The period key becomes the Date axis; labels were built for the grouped rows only
+    grouped_data.columns = ['Date', 'Weekly_Sales']
+    
+    return grouped_data
+
+def get_store_performance(app, train, stores):
+    """Per-store sales metrics from the database, or from the loaded frames for sample data"""
+    if app.db_key:
+        try:
+            return sql_store_performance(*app.db_key)
+        except Exception as e:
+            st.warning(f"Could not query the database: {e}. Using the loaded data.")
+    
+    # Aggregate first, then attach store attributes to the per-store rows only
+    store_performance = train.groupby('Store', sort=False).agg(
+        Total_Sales=('Weekly_Sales', 'sum'),
+        Avg_Sales=('Weekly_Sales', 'mean'),
+        Record_Count=('Weekly_Sales', 'size')
+    ).reset_index()
+    
+    return stores[['Store', 'Type', 'Size']].merge(store_performance, on='Store')
+
+def get_dept_performance(app, train):
+    """Per-department sales metrics from the database, or from the loaded frame for sample data"""
+    if app.db_key:
+        try:
+            return sql_dept_performance(*app.db_key)
+        except Exception as e:
+            st.warning(f"Could not query the database: {e}. Using the loaded data.")
+    
+    dept_performance = train.groupby('Dept', sort=False).agg(
+        Total_Sales=('Weekly_Sales', 'sum'),
+        Avg_Sales=('Weekly_Sales', 'mean'),
+        Sales_Std=('Weekly_Sales', 'std'),
+        Record_Count=('Weekly_Sales', 'size'),
+        Store_Count=('Store', 'nunique')
+    )
+    
+    return dept_performance.reset_index()
+
+def show_home_page(app, train, stores, features, summary):
     """Display home page with overview metrics"""
     st.header("📊 Sales Analysis Overview")
     
@@ -232,20 +566,17 @@ def show_home_page(train, stores, features):
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_sales = train['Weekly_Sales'].sum()
-        st.metric("Total Sales", f"${total_sales:,.0f}")
+        st.metric("Total Sales", f"${summary.total_sales:,.0f}")
     
     with col2:
-        avg_sales = train['Weekly_Sales'].mean()
-        st.metric("Average Weekly Sales", f"${avg_sales:,.0f}")
+        st.metric("Average Weekly Sales", f"${summary.avg_sales:,.0f}")
     
     with col3:
-        date_range = (train['Date'].max() - train['Date'].min()).days
+        date_range = (summary.date_max - summary.date_min).days
         st.metric("Analysis Period (Days)", f"{date_range:,}")
     
     with col4:
-        total_records = len(train)
-        st.metric("Total Records", f"{total_records:,}")
+        st.metric("Total Records", f"{summary.total_records:,}")
     
     st.markdown("---")
     
@@ -254,8 +585,7 @@ def show_home_page(train, stores, features):
     
     with col1:
         st.subheader("📈 Sales Over Time")
-        monthly_sales = train.groupby(train['Date'].dt.to_period('M'))['Weekly_Sales'].sum().reset_index()
-        monthly_sales['Date'] = monthly_sales['Date'].astype(str)
+        monthly_sales = get_sales_by_period(app, train, "Monthly")
         
         fig = px.line(monthly_sales, x='Date', y='Weekly_Sales',
                      title="Monthly Sales Trend")
@@ -277,17 +607,17 @@ def show_home_page(train, stores, features):
     
     with col1:
         st.write("**Sales Data Sample**")
-        st.dataframe(train.head())
+        st.dataframe(train.head(PREVIEW_ROWS).drop(columns=TIME_COLUMNS), use_container_width=True, hide_index=True)
     
     with col2:
         st.write("**Store Information**")
-        st.dataframe(stores.head())
+        st.dataframe(stores.head(PREVIEW_ROWS), use_container_width=True, hide_index=True)
     
     with col3:
         st.write("**Features Data Sample**")
-        st.dataframe(features.head())
+        st.dataframe(features.head(PREVIEW_ROWS), use_container_width=True, hide_index=True)
 
-def show_sales_trends(train):
+def show_sales_trends(app, train):
     """Display sales trends analysis"""
     st.header("📈 Sales Trends Analysis")
     
@@ -302,30 +632,19 @@ def show_sales_trends(train):
                                  ["Line Chart", "Bar Chart", "Area Chart"])
     
     # Aggregate data based on selection
-    if aggregation == "Weekly":
-        grouped_data = train.groupby('Date')['Weekly_Sales'].sum().reset_index()
-    elif aggregation == "Monthly":
-        grouped_data = train.groupby(train['Date'].dt.to_period('M'))['Weekly_Sales'].sum().reset_index()
-        grouped_data['Date'] = grouped_data['Date'].astype(str)
-    elif aggregation == "Quarterly":
-        grouped_data = train.groupby(train['Date'].dt.to_period('Q'))['Weekly_Sales'].sum().reset_index()
-        grouped_data['Date'] = grouped_data['Date'].astype(str)
-    else:  # Yearly
-        grouped_data = train.groupby(train['Date'].dt.year)['Weekly_Sales'].sum().reset_index()
-        grouped_data.columns = ['Date', 'Weekly_Sales']
+    grouped_data = get_sales_by_period(app, train, aggregation)
     
     # Create chart based on selection
     if chart_type == "Line Chart":
-        fig = px.line(grouped_data, x='Date', y='Weekly_Sales',
-                     title=f"{aggregation} Sales Trend")
+        fig = px.line(downsample_minmax(grouped_data, 'Weekly_Sales'), x='Date', y='Weekly_Sales',
+                     title=f"{aggregation} Sales Trend", render_mode='webgl', height=500)
     elif chart_type == "Bar Chart":
         fig = px.bar(grouped_data, x='Date', y='Weekly_Sales',
-                    title=f"{aggregation} Sales")
-    else:  # Area Chart
-        fig = px.area(grouped_data, x='Date', y='Weekly_Sales',
-                     title=f"{aggregation} Sales Trend")
+                    title=f"{aggregation} Sales", height=500)
+    else:  # Area Chart (px.area has no WebGL render mode)
+        fig = px.area(downsample_minmax(grouped_data, 'Weekly_Sales'), x='Date', y='Weekly_Sales',
+                     title=f"{aggregation} Sales Trend", height=500)
     
-    fig.update_layout(height=500)
     st.plotly_chart(fig, use_container_width=True)
     
     # Growth analysis
@@ -342,41 +661,35 @@ def show_sales_trends(train):
         with col3:
             st.metric("Lowest Sales", f"${grouped_data['Weekly_Sales'].min():,.0f}")
 
-def show_store_performance(train, stores):
+def show_store_performance(app, train, stores):
     """Display store performance analysis"""
     st.header("🏪 Store Performance Analysis")
     
-    # Merge train with stores data
-    train_stores = train.merge(stores, on='Store')
-    
     # Store performance metrics
-    store_performance = train_stores.groupby(['Store', 'Type', 'Size']).agg({
-        'Weekly_Sales': ['sum', 'mean', 'count']
-    }).round(2)
-    
-    store_performance.columns = ['Total_Sales', 'Avg_Sales', 'Record_Count']
-    store_performance = store_performance.reset_index().sort_values('Total_Sales', ascending=False)
+    store_performance = get_store_performance(app, train, stores).round(2)
     
     # Top performers
     st.subheader("🏆 Top Performing Stores")
     col1, col2 = st.columns(2)
     
     with col1:
-        top_stores = store_performance.head(10)
+        top_stores = store_performance.nlargest(10, 'Total_Sales')
         fig = px.bar(top_stores, x='Store', y='Total_Sales',
                     title="Top 10 Stores by Total Sales")
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
-        # Store type performance
-        type_performance = train_stores.groupby('Type')['Weekly_Sales'].agg(['sum', 'mean', 'count']).reset_index()
+        # Store type performance, rolled up from the per-store totals
+        type_performance = store_performance.groupby('Type', observed=True)[['Total_Sales', 'Record_Count']].sum().reset_index()
+        type_performance.columns = ['Type', 'sum', 'count']
+        type_performance['mean'] = type_performance['sum'] / type_performance['count']
         fig = px.bar(type_performance, x='Type', y='sum',
                     title="Sales by Store Type")
         st.plotly_chart(fig, use_container_width=True)
     
     # Detailed table
     st.subheader("📋 Store Performance Details")
-    st.dataframe(store_performance)
+    st.dataframe(store_performance.sort_values('Total_Sales', ascending=False))
     
     # Store size analysis
     st.subheader("📏 Store Size vs Performance")
@@ -385,26 +698,23 @@ def show_store_performance(train, stores):
                     title="Store Size vs Sales Performance")
     st.plotly_chart(fig, use_container_width=True)
 
-def show_department_analysis(train):
+def show_department_analysis(app, train):
     """Display department analysis"""
     st.header("🏷️ Department Performance Analysis")
     
     # Department performance
-    dept_performance = train.groupby('Dept').agg({
-        'Weekly_Sales': ['sum', 'mean', 'std', 'count'],
-        'Store': 'nunique'
-    }).round(2)
-    
-    dept_performance.columns = ['Total_Sales', 'Avg_Sales', 'Sales_Std', 'Record_Count', 'Store_Count']
-    dept_performance['CV'] = (dept_performance['Sales_Std'] / dept_performance['Avg_Sales'] * 100).round(2)
-    dept_performance = dept_performance.reset_index().sort_values('Total_Sales', ascending=False)
+    dept_performance = get_dept_performance(app, train).round(2)
+    sales_std = dept_performance['Sales_Std'].to_numpy(dtype=np.float64)
+    avg_sales = dept_performance['Avg_Sales'].to_numpy(dtype=np.float64)
+    cv = np.divide(sales_std, avg_sales, out=np.full_like(sales_std, np.nan), where=avg_sales != 0)
+    dept_performance['CV'] = (cv * 100).round(2)
     
     # Top departments
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("🔝 Top Revenue Departments")
-        top_depts = dept_performance.head(15)
+        top_depts = dept_performance.nlargest(15, 'Total_Sales')
         fig = px.bar(top_depts, x='Dept', y='Total_Sales',
                     title="Top 15 Departments by Revenue")
         fig.update_layout(xaxis={'type': 'category'})
@@ -422,7 +732,7 @@ def show_department_analysis(train):
     
     with col1:
         # Most consistent (lowest CV)
-        consistent_depts = dept_performance[dept_performance['Record_Count'] >= 50].sort_values('CV').head(10)
+        consistent_depts = dept_performance[dept_performance['Record_Count'] >= 50].nsmallest(10, 'CV')
         fig = px.bar(consistent_depts, x='Dept', y='CV',
                     title="Most Consistent Departments (Low Variability)")
         fig.update_layout(xaxis={'type': 'category'})
@@ -438,27 +748,19 @@ def show_department_analysis(train):
     
     # Detailed table
     st.subheader("📋 Department Performance Details")
-    st.dataframe(dept_performance)
+    st.dataframe(dept_performance.sort_values('Total_Sales', ascending=False))
 
 def show_seasonality_analysis(train):
     """Display seasonality analysis"""
     st.header("📅 Seasonality Analysis")
     
-    # Add time components
-    train_copy = train.copy()
-    train_copy['Month'] = train_copy['Date'].dt.month
-    train_copy['DayOfWeek'] = train_copy['Date'].dt.day_name()
-    train_copy['Quarter'] = train_copy['Date'].dt.quarter
-    
+    # Month, DayOfWeek and Quarter are precomputed by the loaders
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📆 Monthly Patterns")
-        monthly_pattern = train_copy.groupby('Month')['Weekly_Sales'].mean().reset_index()
-        monthly_pattern['Month_Name'] = monthly_pattern['Month'].map({
-            1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
-            7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
-        })
+        monthly_pattern = train.groupby('Month')['Weekly_Sales'].mean().reset_index()
+        monthly_pattern['Month_Name'] = MONTH_NAMES[monthly_pattern['Month'].to_numpy() - 1]
         
         fig = px.line(monthly_pattern, x='Month_Name', y='Weekly_Sales',
                      title="Average Sales by Month")
@@ -467,10 +769,8 @@ def show_seasonality_analysis(train):
     
     with col2:
         st.subheader("📅 Day of Week Patterns")
-        dow_pattern = train_copy.groupby('DayOfWeek')['Weekly_Sales'].mean().reset_index()
-        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        dow_pattern['DayOfWeek'] = pd.Categorical(dow_pattern['DayOfWeek'], categories=day_order, ordered=True)
-        dow_pattern = dow_pattern.sort_values('DayOfWeek')
+        # Ordered categorical, so groups come back in weekday order
+        dow_pattern = train.groupby('DayOfWeek', observed=True)['Weekly_Sales'].mean().reset_index()
         
         fig = px.bar(dow_pattern, x='DayOfWeek', y='Weekly_Sales',
                     title="Average Sales by Day of Week")
@@ -501,14 +801,14 @@ def show_seasonality_analysis(train):
     
     # Quarterly trends
     st.subheader("📊 Quarterly Trends")
-    quarterly_trend = train_copy.groupby(['Date', 'Quarter'])['Weekly_Sales'].sum().reset_index()
+    quarterly_trend = train.groupby(['Date', 'Quarter'])['Weekly_Sales'].sum().reset_index()
     quarterly_avg = quarterly_trend.groupby('Quarter')['Weekly_Sales'].mean().reset_index()
     
     fig = px.bar(quarterly_avg, x='Quarter', y='Weekly_Sales',
                 title="Average Sales by Quarter")
     st.plotly_chart(fig, use_container_width=True)
 
-def show_advanced_analytics(train, features):
+def show_advanced_analytics(app, train, features):
     """Display advanced analytics"""
     st.header("🔍 Advanced Analytics")
     
@@ -519,16 +819,16 @@ def show_advanced_analytics(train, features):
     
     # Calculate moving averages
     weekly_sales = train.groupby('Date')['Weekly_Sales'].sum().reset_index().sort_values('Date')
-    weekly_sales[f'MA_{window_size}'] = weekly_sales['Weekly_Sales'].rolling(window=window_size).mean()
+    weekly_sales[f'MA_{window_size}'] = rolling_mean(weekly_sales['Weekly_Sales'].to_numpy(), window_size)
+    plot_data = downsample_minmax(weekly_sales, 'Weekly_Sales')
     
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=weekly_sales['Date'], y=weekly_sales['Weekly_Sales'],
-                           mode='lines', name='Weekly Sales', opacity=0.6))
-    fig.add_trace(go.Scatter(x=weekly_sales['Date'], y=weekly_sales[f'MA_{window_size}'],
-                           mode='lines', name=f'{window_size}-Week Moving Average',
-                           line=dict(width=3)))
+    fig = go.Figure(layout=dict(title="Sales Trend with Moving Average", height=500))
+    fig.add_trace(go.Scattergl(x=plot_data['Date'], y=plot_data['Weekly_Sales'],
+                             mode='lines', name='Weekly Sales', opacity=0.6))
+    fig.add_trace(go.Scattergl(x=plot_data['Date'], y=plot_data[f'MA_{window_size}'],
+                             mode='lines', name=f'{window_size}-Week Moving Average',
+                             line=dict(width=3)))
     
-    fig.update_layout(title="Sales Trend with Moving Average", height=500)
     st.plotly_chart(fig, use_container_width=True)
     
     # Correlation analysis
@@ -536,7 +836,7 @@ def show_advanced_analytics(train, features):
         st.subheader("🔗 Correlation Analysis")
         
         # Merge sales with features
-        train_features = train.merge(features, on=['Store', 'Date'], how='inner')
+        train_features = join_train_features(app.data_key, train, features)
         
         if len(train_features) > 0:
             # Calculate correlations
@@ -544,14 +844,19 @@ def show_advanced_analytics(train, features):
             available_cols = [col for col in numeric_cols if col in train_features.columns]
             
             if len(available_cols) > 1:
-                corr_matrix = train_features[available_cols].corr()
+                # One BLAS pass over the complete rows instead of pairwise column scans
+                values = train_features[available_cols].to_numpy(dtype=np.float64)
+                values = values[~np.isnan(values).any(axis=1)]
+                corr_matrix = pd.DataFrame(np.corrcoef(values, rowvar=False),
+                                           index=available_cols, columns=available_cols)
                 
                 fig = px.imshow(corr_matrix, text_auto=True, aspect="auto",
                                title="Correlation Matrix: Sales vs External Factors")
                 st.plotly_chart(fig, use_container_width=True)
                 
-                # Show correlations with sales
-                sales_corr = corr_matrix['Weekly_Sales'].drop('Weekly_Sales').sort_values(key=abs, ascending=False)
+                # Show correlations with sales (Weekly_Sales is the first row), strongest first
+                sales_corr = corr_matrix.iloc[0, 1:]
+                sales_corr = sales_corr.iloc[np.argsort(-np.abs(sales_corr.to_numpy()))]
                 
                 st.write("**Correlation with Weekly Sales:**")
                 for factor, corr in sales_corr.items():
@@ -562,13 +867,13 @@ def show_advanced_analytics(train, features):
     
     store_stats = train.groupby('Store')['Weekly_Sales'].agg(['mean', 'std', 'count']).reset_index()
     store_stats['CV'] = store_stats['std'] / store_stats['mean'] * 100
-    store_stats = store_stats[store_stats['count'] >= 10].sort_values('CV')
+    store_stats = store_stats[store_stats['count'] >= 10]
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Most consistent stores
-        top_consistent = store_stats.head(10)
+        top_consistent = store_stats.nsmallest(10, 'CV')
         fig = px.bar(top_consistent, x='Store', y='CV',
                     title="Most Consistent Stores (Lowest Variability)")
         fig.update_layout(xaxis={'type': 'category'})
@@ -670,7 +975,9 @@ def show_sql_interface(app):
         placeholder="SELECT * FROM train LIMIT 10;"
     )
     
-    col1, col2 = st.columns(2)
+    st.caption(f"Results are capped at {MAX_QUERY_ROWS:,} rows.")
+    
+    col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("Execute Query"):
             if custom_query.strip():
@@ -679,10 +986,42 @@ def show_sql_interface(app):
                 st.error("Please enter a SQL query.")
     
     with col2:
+        if st.button("Explain Plan"):
+            if custom_query.strip():
+                app.run_sql_query(f"EXPLAIN QUERY PLAN {custom_query}", "Query Plan")
+            else:
+                st.error("Please enter a SQL query.")
+    
+    with col3:
         if st.button("Show Table Schema"):
             schema_query = "SELECT name, sql FROM sqlite_master WHERE type='table';"
             app.run_sql_query(schema_query, "Database Schema")
 
+def ingest_csv(csv_file, table_name, conn, parquet_path, chunksize=100_000):
+    """Stream a CSV into a SQLite table and a Parquet file one chunk at a time"""
+    writer = None
+    try:
+        with pd.read_csv(csv_file, chunksize=chunksize) as reader:
+            for chunk in reader:
+                if writer is None:
+                    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+                    conn.execute(pd.io.sql.get_schema(chunk, table_name, con=conn))
+                    insert_sql = f"INSERT INTO {table_name} VALUES ({', '.join('?' * len(chunk.columns))})"
+                
+                # SQLite keeps the raw CSV date strings; the Parquet copy gets typed dates
+                conn.executemany(insert_sql, chunk.itertuples(index=False, name=None))
+                if 'Date' in chunk.columns:
+                    chunk['Date'] = pd.to_datetime(chunk['Date'], format=DATE_FORMAT)
+                
+                table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None,
+                                             preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(parquet_path, table.schema, compression='zstd')
+                writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
 def show_data_upload():
     """Display data upload interface"""
     st.header("📋 Data Upload & Management")
@@ -719,31 +1058,50 @@ def show_data_upload():
     # Process uploaded files
     if train_file and stores_file:
         if st.button("Process Uploaded Files"):
+            data_dir = Path("data")
+            uploads = {'train': train_file, 'stores': stores_file}
+            if features_file:
+                uploads['features'] = features_file
+            
             try:
-                # Read uploaded files
-                train_df = pd.read_csv(train_file)
-                stores_df = pd.read_csv(stores_file)
-                
                 # Create database
-                db_path = Path("data/walmart_sales.db")
-                db_path.parent.mkdir(exist_ok=True)
+                db_path = data_dir / "walmart_sales.db"
+                data_dir.mkdir(exist_ok=True)
                 
                 conn = sqlite3.connect(str(db_path))
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA temp_store=MEMORY")
+                conn.execute("PRAGMA cache_size=-200000")
                 
-                # Save to database
-                train_df.to_sql('train', conn, if_exists='replace', index=False)
-                stores_df.to_sql('stores', conn, if_exists='replace', index=False)
-                
-                if features_file:
-                    features_df = pd.read_csv(features_file)
-                    features_df.to_sql('features', conn, if_exists='replace', index=False)
+                # Save to database in a single transaction, Parquet copies alongside
+                with conn:
+                    conn.execute("BEGIN")
+                    for table_name, csv_file in uploads.items():
+                        ingest_csv(csv_file, table_name, conn, data_dir / f"{table_name}.parquet.tmp")
+                    
+                    # Indexes are built after the bulk load
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_train_store ON train(Store)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_train_dept ON train(Dept)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_train_date ON train(Date)")
                 
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
                 conn.close()
                 
+                # Publish the Parquet copies last so they are never older than the database
+                for table_name in uploads:
+                    parquet_path = data_dir / f"{table_name}.parquet"
+                    (data_dir / f"{table_name}.parquet.tmp").replace(parquet_path)
+                    parquet_path.touch()
+                
+                st.cache_data.clear()
                 st.success("✅ Files uploaded and database created successfully!")
                 st.info("🔄 Please refresh the page to use the new data.")
                 
             except Exception as e:
+                # The database rolled back; drop any partial Parquet copies too
+                for table_name in uploads:
+                    (data_dir / f"{table_name}.parquet.tmp").unlink(missing_ok=True)
                 st.error(f"Error processing files: {e}")
     
     # Download sample data template
@@ -56,14 +56,21 @@ def main():
     print("   - Press Ctrl+C to stop the server")
     print("\n" + "=" * 50)
     
-    # Launch Streamlit
+    command = [
+        sys.executable, "-m", "streamlit", "run", "app.py",
+        "--server.port", "8501",
+        "--server.address", "localhost",
+        "--browser.gatherUsageStats", "false"
+    ]
+    
+    # Launch Streamlit in place of this process; Streamlit handles Ctrl+C itself.
+    # Windows has no real exec, so the launcher waits on a child there instead.
+    if os.name != "nt":
+        sys.stdout.flush()
+        os.execv(sys.executable, command)
+    
     try:
-        subprocess.run([
-            sys.executable, "-m", "streamlit", "run", "app.py",
-            "--server.port", "8501",
-            "--server.address", "localhost",
-            "--browser.gatherUsageStats", "false"
-        ])
+        subprocess.run(command)
     except KeyboardInterrupt:
         print("\n🛑 Application stopped by user")
     except Exception as e: